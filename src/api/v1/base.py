@@ -1,9 +1,11 @@
-from typing import List
-from fastapi import APIRouter, Depends, Header, UploadFile
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, Query, UploadFile
 from fastapi.security import HTTPBasic
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models.entities import File
+from src.core.config import app_settings
+from src.models.entities import ChangesPage, File
+from src.services.ratelimit import rate_limiter
 from src.services.services import FilesStorageService
 
 from src.db.db import get_session
@@ -14,31 +16,103 @@ security = HTTPBasic()
 files_storage_service = FilesStorageService()
 
 
-@api_router.post('/register', dependencies=[Depends(files_storage_service.check_allowed_ip)])
+@api_router.post('/register', dependencies=[Depends(files_storage_service.check_allowed_ip), Depends(rate_limiter.limit('auth'))])
 async def register(username: str, password: str, db: AsyncSession = Depends(get_session)):
     return await files_storage_service.register(username, password, db)
 
 
-@api_router.post('/auth', dependencies=[Depends(files_storage_service.check_allowed_ip)])
+@api_router.post('/auth', dependencies=[Depends(files_storage_service.check_allowed_ip), Depends(rate_limiter.limit('auth'))])
 async def auth_user(username: str, password: str, db: AsyncSession = Depends(get_session)):
     return await files_storage_service.auth_user(username, password, db)
 
 
-@api_router.post('/files/upload', response_model=File, dependencies=[Depends(files_storage_service.check_allowed_ip)])
+@api_router.post('/auth/refresh', dependencies=[Depends(files_storage_service.check_allowed_ip), Depends(rate_limiter.limit('auth'))])
+async def refresh_token(refresh_token: str):
+    return await files_storage_service.refresh_token(refresh_token)
+
+
+@api_router.post('/auth/logout', dependencies=[Depends(files_storage_service.check_allowed_ip), Depends(rate_limiter.limit('auth'))])
+async def logout(authorization: str = Header(None)):
+    return await files_storage_service.logout(authorization)
+
+
+@api_router.post('/auth/logout_all', dependencies=[Depends(files_storage_service.check_allowed_ip), Depends(rate_limiter.limit('auth'))])
+async def logout_all(authorization: str = Header(None)):
+    return await files_storage_service.logout_all(authorization)
+
+
+@api_router.post('/files/upload', response_model=File, dependencies=[Depends(files_storage_service.check_allowed_ip), Depends(rate_limiter.limit('upload'))])
 async def upload_file(file: UploadFile, path: str, authorization: str = Header(None), db: AsyncSession = Depends(get_session)):
     return await files_storage_service.upload_file(file, path, authorization, db)
 
 
-@api_router.get('/files/download', dependencies=[Depends(files_storage_service.check_allowed_ip)])
+@api_router.get('/files/download', dependencies=[Depends(files_storage_service.check_allowed_ip), Depends(rate_limiter.limit('download'))])
 async def download_file(file: str, authorization: str = Header(None), db: AsyncSession = Depends(get_session)):
     return await files_storage_service.download_file(file, authorization, db)
 
 
-@api_router.get('/files', response_model=List[File], dependencies=[Depends(files_storage_service.check_allowed_ip)])
+@api_router.post('/files/copy', dependencies=[Depends(files_storage_service.check_allowed_ip), Depends(rate_limiter.limit('default'))])
+async def copy_file(source: str, destination: str, authorization: str = Header(None), db: AsyncSession = Depends(get_session)):
+    return await files_storage_service.copy_file(source, destination, authorization, db)
+
+
+@api_router.post('/files/move', dependencies=[Depends(files_storage_service.check_allowed_ip), Depends(rate_limiter.limit('default'))])
+async def move_file(source: str, destination: str, authorization: str = Header(None), db: AsyncSession = Depends(get_session)):
+    return await files_storage_service.move_file(source, destination, authorization, db)
+
+
+@api_router.post('/files/rename', dependencies=[Depends(files_storage_service.check_allowed_ip), Depends(rate_limiter.limit('default'))])
+async def rename_file(source: str, name: str, authorization: str = Header(None), db: AsyncSession = Depends(get_session)):
+    return await files_storage_service.rename_file(source, name, authorization, db)
+
+
+@api_router.delete('/files', dependencies=[Depends(files_storage_service.check_allowed_ip), Depends(rate_limiter.limit('default'))])
+async def delete_file(file: str, authorization: str = Header(None), db: AsyncSession = Depends(get_session)):
+    return await files_storage_service.delete_file(file, authorization, db)
+
+
+@api_router.get('/files/changes', response_model=ChangesPage, dependencies=[Depends(files_storage_service.check_allowed_ip), Depends(rate_limiter.limit('default'))])
+async def get_changes(cursor: Optional[int] = None, limit: int = Query(100, ge=1, le=app_settings.changes_page_size),
+                      wait: float = 0, authorization: str = Header(None), db: AsyncSession = Depends(get_session)):
+    return await files_storage_service.get_changes(cursor, limit, wait, authorization, db)
+
+
+@api_router.get('/files/changes/stream', dependencies=[Depends(files_storage_service.check_allowed_ip), Depends(rate_limiter.limit('default'))])
+async def stream_changes(cursor: Optional[int] = None, last_event_id: str = Header(None),
+                         authorization: str = Header(None), db: AsyncSession = Depends(get_session)):
+    return await files_storage_service.stream_changes(cursor, last_event_id, authorization, db)
+
+
+@api_router.get('/files', response_model=List[File], dependencies=[Depends(files_storage_service.check_allowed_ip), Depends(rate_limiter.limit('default'))])
 async def user_status(authorization: str = Header(None), db: AsyncSession = Depends(get_session)):
     return await files_storage_service.get_files(authorization, db)
 
 
-@api_router.get('/ping', dependencies=[Depends(files_storage_service.check_allowed_ip)])
-async def ping_services(db: AsyncSession = Depends(get_session)):
-    return await files_storage_service.ping_services(db)
+@api_router.post('/share', dependencies=[Depends(files_storage_service.check_allowed_ip), Depends(rate_limiter.limit('default'))])
+async def share_file(file: str, expire_minutes: Optional[int] = None, authorization: str = Header(None), db: AsyncSession = Depends(get_session)):
+    return await files_storage_service.share_file(file, expire_minutes, authorization, db)
+
+
+@api_router.post('/share/revoke', dependencies=[Depends(files_storage_service.check_allowed_ip), Depends(rate_limiter.limit('default'))])
+async def revoke_share(sid: str, authorization: str = Header(None), db: AsyncSession = Depends(get_session)):
+    return await files_storage_service.revoke_share(sid, authorization, db)
+
+
+@api_router.get('/share/check')
+async def check_share(sid: str):
+    return await files_storage_service.check_share(sid)
+
+
+@api_router.get('/ping', dependencies=[Depends(files_storage_service.check_allowed_ip), Depends(rate_limiter.limit('default'))])
+async def ping_services():
+    return await files_storage_service.ping_services()
+
+
+@api_router.get('/ping/live', dependencies=[Depends(files_storage_service.check_allowed_ip)])
+async def liveness():
+    return await files_storage_service.liveness()
+
+
+@api_router.get('/ping/ready', dependencies=[Depends(files_storage_service.check_allowed_ip)])
+async def readiness():
+    return await files_storage_service.readiness()
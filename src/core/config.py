@@ -12,6 +12,9 @@ ENV_FILE_PATH = os.path.join(BASE_DIR, '.env')
 
 class AppSettings(BaseSettings):
     storage_path = '/tmp/'
+    storage_volumes: list = []
+    storage_fanout_depth: int = 2
+    storage_rebalance_threshold: float = 0.1
     app_title: str = "Files Storage App"
     database_dsn: PostgresDsn
     database_logging: bool = True
@@ -22,7 +25,35 @@ class AppSettings(BaseSettings):
     redis_port: int = 6379
     redis_db: int = 0
     redis_password: str = ''
+    health_probe_interval: float = 5.0
+    health_probe_timeout: float = 1.0
+    health_window: int = 120
+    # [tokens per second, burst] for each route group
+    rate_limits: dict = {
+        'default': [20, 50],
+        'auth': [1, 10],
+        'upload': [5, 20],
+        'download': [50, 100],
+    }
+    # peers allowed to set X-Real-IP, i.e. the nginx in front of the service
+    trusted_proxies: list = []
+    upload_rate_limit_bytes: int = 0
+    download_rate_limit_bytes: int = 0
+    hot_cache_max_bytes: int = 64 * 1024 * 1024
+    hot_cache_small_file_bytes: int = 64 * 1024
+    hot_cache_mmap_file_bytes: int = 16 * 1024 * 1024
+    hot_cache_max_mmaps: int = 256
+    share_link_base_url: str = ''
+    share_link_prefix: str = '/share'
+    share_link_expire_minutes: int = 60
+    share_link_max_expire_minutes: int = 7 * 24 * 60
+    # volumes mounted into nginx as /opt/volumes/<index>/, in STORAGE_VOLUMES order
+    share_link_volumes: int = 1
+    changes_page_size: int = 1000
+    changes_max_wait_seconds: float = 60
+    changes_heartbeat_seconds: float = 15
     access_token_expire_minutes: int = 15
+    refresh_token_expire_minutes: int = 30 * 24 * 60
     secret_token: str = ''
     algorithm: str = 'HS256'
     black_list: list = [
@@ -4,6 +4,9 @@ from fastapi.responses import ORJSONResponse
 
 from src.api.v1 import base
 from src.core.config import app_settings
+from src.services.health import health_prober
+from src.services.ratelimit import BandwidthLimitMiddleware
+from src.services.sharing import share_links
 
 
 app = FastAPI(
@@ -13,7 +16,20 @@ app = FastAPI(
     default_response_class=ORJSONResponse,
 )
 
+app.add_middleware(BandwidthLimitMiddleware)
 app.include_router(base.api_router, prefix="/api/v1")
 
+
+@app.on_event("startup")
+async def startup():
+    share_links.check_volumes()
+    health_prober.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await health_prober.stop()
+
+
 if __name__ == '__main__':
     uvicorn.run("main:app", host=app_settings.project_host, port=app_settings.project_port)
@@ -0,0 +1,39 @@
+"""03_files-path-index
+
+Revision ID: 5d2e8f7a1c30
+Revises: b3f1c2a9d4e5
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2e8f7a1c30'
+down_revision: Union[str, None] = 'b3f1c2a9d4e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_index(table: str, index: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return False
+    return index in [i['name'] for i in inspector.get_indexes(table)]
+
+
+def upgrade() -> None:
+    # tables are created by db_init on first start, so only patch existing ones
+    if sa.inspect(op.get_bind()).has_table('files') and not _has_index('files', 'ix_files_user_id_path'):
+        op.create_index(
+            'ix_files_user_id_path', 'files', ['user_id', 'path'],
+            postgresql_ops={'path': 'varchar_pattern_ops'}
+        )
+
+
+def downgrade() -> None:
+    if _has_index('files', 'ix_files_user_id_path'):
+        op.drop_index('ix_files_user_id_path', table_name='files')
@@ -0,0 +1,63 @@
+"""04_change-feed
+
+Revision ID: 9a4c6e2b7f15
+Revises: 5d2e8f7a1c30
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4c6e2b7f15'
+down_revision: Union[str, None] = '5d2e8f7a1c30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table(table: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(table)
+
+
+def upgrade() -> None:
+    # tables are created by db_init on first start, so only patch existing databases
+    if not _has_table('users'):
+        return
+
+    if not _has_table('file_changes'):
+        op.create_table(
+            'file_changes',
+            sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+            sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('seq', sa.BigInteger(), nullable=False),
+            sa.Column('file_id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('action', sa.String(length=16), nullable=False),
+            sa.Column('path', sa.String(length=1024), nullable=True),
+            sa.Column('old_path', sa.String(length=1024), nullable=True),
+            sa.Column('size', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_file_changes_user_id_seq', 'file_changes', ['user_id', 'seq'], unique=True)
+
+    if not _has_table('change_cursors'):
+        op.create_table(
+            'change_cursors',
+            sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('seq', sa.BigInteger(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('user_id'),
+        )
+
+
+def downgrade() -> None:
+    if _has_table('change_cursors'):
+        op.drop_table('change_cursors')
+    if _has_table('file_changes'):
+        op.drop_index('ix_file_changes_user_id_seq', table_name='file_changes')
+        op.drop_table('file_changes')
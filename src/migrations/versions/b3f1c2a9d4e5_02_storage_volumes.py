@@ -0,0 +1,36 @@
+"""02_storage-volumes
+
+Revision ID: b3f1c2a9d4e5
+Revises: 74bdd3eec380
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f1c2a9d4e5'
+down_revision: Union[str, None] = '74bdd3eec380'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return False
+    return column in [c['name'] for c in inspector.get_columns(table)]
+
+
+def upgrade() -> None:
+    # tables are created by db_init on first start, so only patch existing ones
+    if sa.inspect(op.get_bind()).has_table('files') and not _has_column('files', 'volume'):
+        op.add_column('files', sa.Column('volume', sa.String(length=1024), nullable=True))
+
+
+def downgrade() -> None:
+    if _has_column('files', 'volume'):
+        op.drop_column('files', 'volume')
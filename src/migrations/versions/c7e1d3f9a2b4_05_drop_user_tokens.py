@@ -0,0 +1,42 @@
+"""05_drop-user-tokens
+
+Revision ID: c7e1d3f9a2b4
+Revises: 9a4c6e2b7f15
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e1d3f9a2b4'
+down_revision: Union[str, None] = '9a4c6e2b7f15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _columns(table: str) -> list:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return []
+    return [c['name'] for c in inspector.get_columns(table)]
+
+
+def upgrade() -> None:
+    # sessions live in Redis now, see src/services/sessions.py
+    columns = _columns('users')
+    if 'access_token' in columns:
+        op.drop_column('users', 'access_token')
+    if 'token_expiration_time' in columns:
+        op.drop_column('users', 'token_expiration_time')
+
+
+def downgrade() -> None:
+    columns = _columns('users')
+    if columns and 'access_token' not in columns:
+        op.add_column('users', sa.Column('access_token', sa.String(length=256), nullable=True))
+    if columns and 'token_expiration_time' not in columns:
+        op.add_column('users', sa.Column('token_expiration_time', sa.DateTime(), nullable=True))
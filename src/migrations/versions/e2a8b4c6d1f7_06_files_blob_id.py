@@ -0,0 +1,37 @@
+"""06_files-blob-id
+
+Revision ID: e2a8b4c6d1f7
+Revises: c7e1d3f9a2b4
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a8b4c6d1f7'
+down_revision: Union[str, None] = 'c7e1d3f9a2b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return False
+    return column in [c['name'] for c in inspector.get_columns(table)]
+
+
+def upgrade() -> None:
+    # tables are created by db_init on first start, so only patch existing ones
+    if sa.inspect(op.get_bind()).has_table('files') and not _has_column('files', 'blob_id'):
+        op.add_column('files', sa.Column('blob_id', postgresql.UUID(as_uuid=True), nullable=True))
+
+
+def downgrade() -> None:
+    if _has_column('files', 'blob_id'):
+        op.drop_column('files', 'blob_id')
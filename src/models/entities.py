@@ -1,7 +1,8 @@
 import uuid
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
+from typing import List, Optional
 from pydantic import BaseModel
 
 from .base import Base
@@ -16,8 +17,16 @@ class FileItem(Base):
     path = Column(String(1024))
     size = Column(Integer)
     is_downloadable = Column(Boolean, default=True)
+    volume = Column(String(1024), nullable=True)
+    # set once the file is overwritten, the blob is named after the file id until then
+    blob_id = Column(UUID(as_uuid=True), nullable=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
 
+    __table_args__ = (
+        # serves both exact path lookups and folder prefix scans
+        Index('ix_files_user_id_path', 'user_id', 'path', postgresql_ops={'path': 'varchar_pattern_ops'}),
+    )
+
 
 class File(BaseModel):
     id: str
@@ -34,5 +43,44 @@ class User(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     username = Column(String(32), unique=True, index=True)
     hashed_password = Column(String(256))
-    access_token = Column(String(256), nullable=True)
-    token_expiration_time = Column(DateTime, nullable=True)
+
+
+class FileChange(Base):
+    __tablename__ = 'file_changes'
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    seq = Column(BigInteger, nullable=False)
+    file_id = Column(UUID(as_uuid=True), nullable=False)
+    action = Column(String(16), nullable=False)
+    path = Column(String(1024))
+    old_path = Column(String(1024), nullable=True)
+    size = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_file_changes_user_id_seq', 'user_id', 'seq', unique=True),
+    )
+
+
+class ChangeCursor(Base):
+    __tablename__ = 'change_cursors'
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    seq = Column(BigInteger, nullable=False, default=0)
+
+
+class Change(BaseModel):
+    seq: int
+    action: str
+    file_id: str
+    path: str
+    old_path: Optional[str]
+    size: Optional[int]
+    created_at: datetime
+
+
+class ChangesPage(BaseModel):
+    cursor: int
+    changes: List[Change]
+    has_more: bool
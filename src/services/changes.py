@@ -0,0 +1,144 @@
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from logging import getLogger
+
+from redis.exceptions import RedisError
+from sqlalchemy import func, literal, null, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.entities import Change, ChangeCursor, ChangesPage, FileChange, FileItem
+from src.services.redis import async_redis_client
+
+logger = getLogger(__name__)
+
+
+class ChangeFeed:
+    """Per-user log of file changes for incremental client sync.
+
+    Every user has a gapless sequence in ``change_cursors``. Changes reserve
+    their numbers in the same transaction as the change itself, and the row
+    lock taken by the reservation keeps commit order equal to sequence order,
+    so a client never skips a change by advancing its cursor.
+    """
+
+    channel = 'changes:{user_id}'
+
+    async def reserve(self, db: AsyncSession, user_id, count: int) -> int:
+        cursors = ChangeCursor.__table__
+        stmt = pg_insert(cursors).values(user_id=user_id, seq=count).on_conflict_do_update(
+            index_elements=[cursors.c.user_id], set_={'seq': cursors.c.seq + count}
+        ).returning(cursors.c.seq)
+        last_seq = (await db.execute(stmt)).scalar()
+        return last_seq - count + 1
+
+    async def lock(self, db: AsyncSession, user_id):
+        """Takes the user's cursor row lock until the transaction ends.
+
+        Writers take it before touching file rows, so they all lock in the
+        same order and no other change commits between reading the rows and
+        recording them.
+        """
+        await self.reserve(db, user_id, 0)
+
+    async def record(self, db: AsyncSession, user_id, changes: list):
+        if not changes:
+            return
+        first_seq = await self.reserve(db, user_id, len(changes))
+        created_at = datetime.utcnow()
+        await db.execute(FileChange.__table__.insert(), [
+            {
+                'user_id': user_id,
+                'seq': first_seq + i,
+                'created_at': created_at,
+                'old_path': None,
+                'size': None,
+                **change,
+            }
+            for i, change in enumerate(changes)
+        ])
+
+    async def record_bulk(self, db: AsyncSession, user_id, action: str, condition, new_path=None):
+        """Records ``action`` for every file matching ``condition`` with a
+        single INSERT ... SELECT, so folder operations stay set-based."""
+        files = FileItem.__table__
+        await self.lock(db, user_id)
+        count = (await db.execute(select(func.count()).select_from(files).where(condition))).scalar()
+        if not count:
+            return
+        first_seq = await self.reserve(db, user_id, count)
+        rows = select(
+            files.c.user_id,
+            literal(first_seq - 1) + func.row_number().over(order_by=files.c.path),
+            files.c.id,
+            literal(action),
+            files.c.path if new_path is None else new_path,
+            null() if new_path is None else files.c.path,
+            files.c.size,
+            literal(datetime.utcnow()),
+        ).where(condition)
+        columns = ['user_id', 'seq', 'file_id', 'action', 'path', 'old_path', 'size', 'created_at']
+        await db.execute(FileChange.__table__.insert().from_select(columns, rows))
+
+    async def notify(self, user_id):
+        try:
+            await async_redis_client.publish(self.channel.format(user_id=user_id), 1)
+        except (RedisError, OSError) as e:
+            # long-polling clients still catch up on their next poll
+            logger.warning(f'Could not publish change notification: {e!r}')
+
+    async def current_cursor(self, db: AsyncSession, user_id) -> int:
+        seq = await db.execute(select(ChangeCursor.seq).where(ChangeCursor.user_id == user_id))
+        return seq.scalar() or 0
+
+    async def since(self, db: AsyncSession, user_id, cursor: int, limit: int) -> ChangesPage:
+        changes = await db.execute(
+            FileChange.__table__.select().where(
+                FileChange.user_id == user_id, FileChange.seq > cursor
+            ).order_by(FileChange.seq).limit(limit + 1)
+        )
+        change_records = changes.fetchall()
+        has_more = len(change_records) > limit
+        change_records = change_records[:limit]
+        return ChangesPage(
+            cursor=change_records[-1].seq if change_records else cursor,
+            changes=[
+                Change(
+                    seq=change_record.seq,
+                    action=change_record.action,
+                    file_id=str(change_record.file_id),
+                    path=change_record.path,
+                    old_path=change_record.old_path,
+                    size=change_record.size,
+                    created_at=change_record.created_at
+                )
+                for change_record in change_records
+            ],
+            has_more=has_more,
+        )
+
+    @asynccontextmanager
+    async def subscribe(self, user_id):
+        """Yields ``wait(timeout)``, which returns True once a change for the
+        user is committed. Subscribe before reading the log, so a change
+        committed in between is not missed."""
+        pubsub = async_redis_client.pubsub()
+        await pubsub.subscribe(self.channel.format(user_id=user_id))
+
+        async def wait(timeout: float) -> bool:
+            deadline = time.monotonic() + timeout
+            while (remaining := deadline - time.monotonic()) > 0:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+                if message is not None:
+                    return True
+            return False
+
+        try:
+            yield wait
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.close()
+
+
+change_feed = ChangeFeed()
@@ -0,0 +1,121 @@
+import hashlib
+import mmap
+import os
+from collections import OrderedDict
+from email.utils import formatdate
+
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from src.core.config import app_settings
+
+
+class HotFileCache:
+    """Per-worker cache for downloads.
+
+    Small files are kept in memory in a byte-bounded LRU, medium files are
+    mapped with mmap and large files are streamed from disk as before.
+    Entries are validated against the file's inode, size and mtime on every
+    hit, so overwrites from other workers are never served stale.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, max_bytes: int = None, small_file_bytes: int = None, mmap_file_bytes: int = None,
+                 max_mmaps: int = None):
+        self.max_bytes = app_settings.hot_cache_max_bytes if max_bytes is None else max_bytes
+        self.small_file_bytes = app_settings.hot_cache_small_file_bytes if small_file_bytes is None \
+            else small_file_bytes
+        self.mmap_file_bytes = app_settings.hot_cache_mmap_file_bytes if mmap_file_bytes is None \
+            else mmap_file_bytes
+        self.max_mmaps = app_settings.hot_cache_max_mmaps if max_mmaps is None else max_mmaps
+        self.entries = OrderedDict()
+        self.mmaps = OrderedDict()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _version(stat_result: os.stat_result) -> tuple:
+        return stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns
+
+    @staticmethod
+    def _stat_headers(stat_result: os.stat_result) -> dict:
+        # same validators as FileResponse, so clients revalidate the same way for every size
+        etag_base = f'{stat_result.st_mtime}-{stat_result.st_size}'
+        return {
+            'content-length': str(stat_result.st_size),
+            'last-modified': formatdate(stat_result.st_mtime, usegmt=True),
+            'etag': f'"{hashlib.md5(etag_base.encode(), usedforsecurity=False).hexdigest()}"',
+        }
+
+    def _evict(self, path: str):
+        entry = self.entries.pop(path, None)
+        if entry is not None:
+            self.resident_bytes -= len(entry[1])
+        # mapped regions are released once in-flight responses drop them
+        self.mmaps.pop(path, None)
+
+    def invalidate(self, path: str):
+        self._evict(path)
+
+    def _load_small(self, path: str, version: tuple) -> bytes:
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.entries[path] = (version, data)
+        self.resident_bytes += len(data)
+        while self.resident_bytes > self.max_bytes and self.entries:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.resident_bytes -= len(evicted)
+        return data
+
+    def _load_mmap(self, path: str, version: tuple) -> mmap.mmap:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.mmaps[path] = (version, mapped)
+        while len(self.mmaps) > self.max_mmaps:
+            self.mmaps.popitem(last=False)
+        return mapped
+
+    async def _iter_mmap(self, mapped: mmap.mmap):
+        for offset in range(0, len(mapped), self.chunk_size):
+            yield mapped[offset:offset + self.chunk_size]
+
+    def get_response(self, path: str, media_type: str) -> Response:
+        stat_result = os.stat(path)
+        version = self._version(stat_result)
+        size = stat_result.st_size
+
+        if size > self.mmap_file_bytes:
+            self._evict(path)
+            return FileResponse(path, media_type=media_type, stat_result=stat_result)
+
+        small = size <= self.small_file_bytes
+        cache = self.entries if small else self.mmaps
+        cached = cache.get(path)
+        if cached is not None and cached[0] == version:
+            self.hits += 1
+            cache.move_to_end(path)
+            payload = cached[1]
+        else:
+            self.misses += 1
+            self._evict(path)
+            payload = self._load_small(path, version) if small else self._load_mmap(path, version)
+
+        headers = self._stat_headers(stat_result)
+        if small:
+            return Response(content=payload, media_type=media_type, headers=headers)
+        return StreamingResponse(self._iter_mmap(payload), media_type=media_type, headers=headers)
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / requests if requests else None,
+            'resident_bytes': self.resident_bytes,
+            'entries': len(self.entries),
+            'mmaps': len(self.mmaps),
+        }
+
+
+hot_file_cache = HotFileCache()
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import shutil
+import time
+from collections import deque
+from logging import getLogger
+
+from sqlalchemy import text
+
+from src.core.config import app_settings
+from src.db.db import async_session
+from src.services.filecache import hot_file_cache
+from src.services.redis import async_redis_client
+from src.services.storage import storage_volumes
+
+logger = getLogger(__name__)
+
+
+def percentile(samples: list, q: float):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class HealthProber:
+    """Probes related services concurrently in a background task.
+
+    Every probe has its own timeout and is timed with a monotonic clock;
+    handlers only read the last snapshot and never touch the services.
+    """
+
+    def __init__(self, interval: float = None, timeout: float = None, window: int = None):
+        self.interval = app_settings.health_probe_interval if interval is None else interval
+        self.timeout = app_settings.health_probe_timeout if timeout is None else timeout
+        window = app_settings.health_window if window is None else window
+        self.probes = {
+            'db': self.probe_database,
+            'cache': self.probe_cache,
+            'storage': self.probe_storage,
+        }
+        self.samples = {name: deque(maxlen=window) for name in self.probes}
+        self.latest = {}
+        self.storage_stats = {}
+        self.checked_at = None
+        self._task = None
+
+    async def probe_database(self):
+        async with async_session() as session:
+            await session.execute(text('SELECT 1'))
+
+    async def probe_cache(self):
+        await async_redis_client.ping()
+
+    def _probe_volume(self, volume: str) -> dict:
+        probe_path = os.path.join(volume, '.healthcheck')
+        start_time = time.perf_counter()
+        with open(probe_path, 'wb') as f:
+            f.write(b'test')
+            f.flush()
+            fsync_start = time.perf_counter()
+            os.fsync(f.fileno())
+            fsync_time = time.perf_counter() - fsync_start
+        write_time = time.perf_counter() - start_time
+        usage = shutil.disk_usage(volume)
+        return {
+            'write_us': round(write_time * 1_000_000),
+            'fsync_us': round(fsync_time * 1_000_000),
+            'free_bytes': usage.free,
+            'total_bytes': usage.total,
+        }
+
+    async def probe_storage(self):
+        stats = await asyncio.gather(
+            *(asyncio.to_thread(self._probe_volume, volume) for volume in storage_volumes.volumes)
+        )
+        self.storage_stats = dict(zip(storage_volumes.volumes, stats))
+
+    async def _run_probe(self, name: str, probe):
+        start_time = time.perf_counter()
+        try:
+            await asyncio.wait_for(probe(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f'Health probe {name} timed out after {self.timeout}s')
+            return None
+        except Exception as e:
+            logger.warning(f'Health probe {name} failed: {e!r}')
+            return None
+        return round((time.perf_counter() - start_time) * 1_000_000)
+
+    async def probe_all(self):
+        names = list(self.probes)
+        results = await asyncio.gather(*(self._run_probe(name, self.probes[name]) for name in names))
+        for name, latency in zip(names, results):
+            if latency is not None:
+                self.samples[name].append(latency)
+        self.latest = dict(zip(names, results))
+        self.checked_at = time.monotonic()
+
+    async def _run(self):
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def latencies(self) -> dict:
+        if self.checked_at is None:
+            await self.probe_all()
+        return dict(self.latest)
+
+    def is_alive(self) -> bool:
+        if self.checked_at is None:
+            return self._task is not None and not self._task.done()
+        return time.monotonic() - self.checked_at <= self.interval * 3 + self.timeout
+
+    async def report(self) -> dict:
+        latencies = await self.latencies()
+        return {
+            'ready': all(latency is not None for latency in latencies.values()),
+            'age_us': round((time.monotonic() - self.checked_at) * 1_000_000),
+            'services': {
+                name: {
+                    'latency_us': latency,
+                    'p50_us': percentile(list(self.samples[name]), 50),
+                    'p95_us': percentile(list(self.samples[name]), 95),
+                    'p99_us': percentile(list(self.samples[name]), 99),
+                }
+                for name, latency in latencies.items()
+            },
+            'storage': self.storage_stats,
+            'file_cache': hot_file_cache.stats(),
+        }
+
+
+health_prober = HealthProber()
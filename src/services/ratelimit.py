@@ -0,0 +1,189 @@
+import asyncio
+import ipaddress
+import math
+import time
+from logging import getLogger
+
+from fastapi import HTTPException, Header, Request
+from jose import JWTError, jwt
+from redis.exceptions import RedisError
+
+from src.core.config import app_settings
+from src.services.redis import async_redis_client
+
+logger = getLogger(__name__)
+
+# Refills and takes ``cost`` tokens from every bucket in KEYS atomically.
+# Tokens are only taken when all buckets have enough of them, so per-user and
+# per-IP limits cost a single round trip. Redis TIME is used as the clock so
+# workers never disagree about it.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local ttl = math.ceil(capacity * 1000 / rate) + 1000
+
+local tokens = {}
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local available = tonumber(bucket[1])
+    local ts = tonumber(bucket[2])
+    if available == nil then
+        available = capacity
+        ts = now
+    end
+    available = math.min(capacity, available + math.max(0, now - ts) * rate / 1000)
+    if available < cost then
+        retry_after = math.max(retry_after, math.ceil((cost - available) * 1000 / rate))
+    end
+    tokens[i] = available
+end
+
+local allowed = 0
+if retry_after == 0 then
+    allowed = 1
+end
+local remaining = capacity
+for i, key in ipairs(KEYS) do
+    local available = tokens[i]
+    if allowed == 1 then
+        available = available - cost
+    end
+    remaining = math.min(remaining, available)
+    redis.call('HSET', key, 'tokens', tostring(available), 'ts', tostring(now))
+    redis.call('PEXPIRE', key, ttl)
+end
+return {allowed, math.floor(remaining), retry_after}
+"""
+
+
+def is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network) for network in app_settings.trusted_proxies)
+
+
+def client_ip(request: Request) -> str:
+    peer = request.client.host if request.client else ''
+    # nginx overwrites X-Real-IP with the peer address, see services/nginx.conf;
+    # anyone else could pick a fresh value per request
+    real_ip = request.headers.get('x-real-ip')
+    if real_ip and is_trusted_proxy(peer):
+        return real_ip
+    return peer
+
+
+class RateLimiter:
+    """Token-bucket request limiter shared by all workers through Redis.
+
+    Limits are configured per route group in ``app_settings.rate_limits`` as
+    ``[tokens per second, burst]`` and applied both per client IP and per
+    authenticated user.
+    """
+
+    def __init__(self, limits: dict = None):
+        self.limits = app_settings.rate_limits if limits is None else limits
+        self.script = async_redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    @staticmethod
+    def get_username(authorization: str):
+        if not authorization or not authorization.startswith('Bearer '):
+            return None
+        try:
+            payload = jwt.decode(
+                authorization.replace('Bearer ', ''), app_settings.secret_token, algorithms=[app_settings.algorithm]
+            )
+        except JWTError:
+            return None
+        return payload.get('sub')
+
+    async def hit(self, group: str, request: Request, authorization: str = None, cost: int = 1):
+        rate, burst = self.limits.get(group, self.limits['default'])
+        keys = [f'ratelimit:{group}:ip:{client_ip(request)}']
+        if username := self.get_username(authorization):
+            keys.append(f'ratelimit:{group}:user:{username}')
+
+        try:
+            allowed, remaining, retry_after = await self.script(keys=keys, args=[rate, burst, cost])
+        except (RedisError, OSError) as e:
+            # the limiter must never take the service down with it
+            logger.warning(f'Rate limiter is unavailable: {e!r}')
+            return
+
+        if not allowed:
+            raise HTTPException(
+                status_code=429,
+                detail='Too many requests',
+                headers={
+                    'Retry-After': str(max(1, math.ceil(retry_after / 1000))),
+                    'X-RateLimit-Limit': str(burst),
+                    'X-RateLimit-Remaining': '0',
+                },
+            )
+
+    def limit(self, group: str):
+        async def dependency(request: Request, authorization: str = Header(None)):
+            await self.hit(group, request, authorization)
+
+        return dependency
+
+
+class ByteRateThrottle:
+    """Paces a single connection to at most ``rate`` bytes per second."""
+
+    def __init__(self, rate: int):
+        self.rate = rate
+        self.transferred = 0
+        self.started_at = time.monotonic()
+
+    async def consume(self, size: int):
+        self.transferred += size
+        delay = self.transferred / self.rate - (time.monotonic() - self.started_at)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class BandwidthLimitMiddleware:
+    """ASGI middleware capping upload and download byte rates per connection,
+    so bulk transfers do not starve interactive requests."""
+
+    def __init__(self, app, upload_rate: int = None, download_rate: int = None):
+        self.app = app
+        self.upload_rate = app_settings.upload_rate_limit_bytes if upload_rate is None else upload_rate
+        self.download_rate = app_settings.download_rate_limit_bytes if download_rate is None else download_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        path = scope['path']
+        if self.upload_rate and path.endswith('/files/upload'):
+            throttle = ByteRateThrottle(self.upload_rate)
+
+            async def throttled_receive():
+                message = await receive()
+                if message['type'] == 'http.request':
+                    await throttle.consume(len(message.get('body', b'')))
+                return message
+
+            return await self.app(scope, throttled_receive, send)
+
+        if self.download_rate and path.endswith('/files/download'):
+            throttle = ByteRateThrottle(self.download_rate)
+
+            async def throttled_send(message):
+                await send(message)
+                if message['type'] == 'http.response.body':
+                    await throttle.consume(len(message.get('body', b'')))
+
+            return await self.app(scope, receive, throttled_send)
+
+        return await self.app(scope, receive, send)
+
+
+rate_limiter = RateLimiter()
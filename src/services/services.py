@@ -1,26 +1,33 @@
 import asyncio
-from datetime import datetime, timedelta
+from datetime import datetime
 from logging import config as logging_config, getLogger
 import uuid
 import ipaddress
+import mimetypes
 import socket
 import os
-import time
-import redis
+import posixpath
+from typing import Optional
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from fastapi import HTTPException, Request, Header, Depends, UploadFile
-from fastapi.responses import FileResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import and_, func, literal, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.exc import DBAPIError
 
-from src.models.entities import User, File, FileItem
+from src.models.entities import User, File, FileItem, ChangesPage
 from src.core.config import app_settings
 from src.core.logger import LOGGING
 from src.db.db import get_session, db_init
-from src.services.redis import redis_cached_async, redis_client
+from src.services.changes import change_feed
+from src.services.filecache import hot_file_cache
+from src.services.health import health_prober
+from src.services.ratelimit import client_ip
+from src.services.sessions import session_store
+from src.services.sharing import share_links
+from src.services.storage import storage_volumes
 
 logger = getLogger(__name__)
 
@@ -33,56 +40,32 @@ class FilesStorageService:
 
     pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-    @staticmethod
-    async def get_user_id_from_db(username: str, db: AsyncSession):
-        user = await db.execute(User.__table__.select().where(User.username == username))
-        user = user.fetchone()
-        if user:
-            return user.id
-        return None
-
-    @staticmethod
-    def create_access_token(data: dict, expires_delta: timedelta = None):
-        to_encode = data.copy()
-        if expires_delta:
-            expire = datetime.utcnow() + expires_delta
-        else:
-            expire = datetime.utcnow() + timedelta(minutes=15)
-        to_encode['exp'] = expire
-        return jwt.encode(
-            to_encode, app_settings.secret_token, algorithm=app_settings.algorithm
-        )
-
-    async def update_user_tokens(self, user: User, access_token: str, token_expiration_time: datetime,
-                                 db: AsyncSession):
-
-        stmt = User.__table__.update().where(User.id == user.id).values(
-            access_token=access_token,
-            token_expiration_time=token_expiration_time
-        )
-        await db.execute(stmt)
-        await db.commit()
-
     async def auth_user(self, username: str, password: str, db: AsyncSession):
         user = await db.execute(User.__table__.select().where(User.username == username))
         user = user.fetchone()
-        if user is None or not self.pwd_context.verify(password, user['hashed_password']):
+        # bcrypt is slow on purpose, keep it off the event loop
+        if user is None or not await asyncio.to_thread(self.pwd_context.verify, password, user.hashed_password):
             raise HTTPException(status_code=401, detail='Unauthorized')
 
-        access_token_expires = timedelta(minutes=app_settings.access_token_expire_minutes)
-        access_token = self.create_access_token(data={'sub': user.username}, expires_delta=access_token_expires)
-        token_expiration_time = datetime.utcnow() + access_token_expires
+        return await session_store.create(user.id, user.username)
 
-        stmt = User.__table__.update().where(User.id == user.id).values(
-            access_token=access_token,
-            token_expiration_time=token_expiration_time
-        )
-        await db.execute(stmt)
-        await db.commit()
+    async def refresh_token(self, refresh_token: str):
+        tokens = await session_store.refresh(refresh_token)
+        if tokens is None:
+            raise HTTPException(status_code=401, detail='Invalid refresh token')
+        return tokens
+
+    async def logout(self, authorization: str):
+        payload = await self.get_authorization_token(authorization)
+        await session_store.revoke(payload['sid'])
+        return {'detail': 'Session revoked'}
 
-        return {'access_token': access_token, 'token_type': 'bearer'}
+    async def logout_all(self, authorization: str):
+        payload = await self.get_authorization_token(authorization)
+        await session_store.revoke_all(payload['uid'])
+        return {'detail': 'All sessions revoked'}
 
-    async def get_authorization_token(self, authorization: str = Header(None), db: AsyncSession = Depends(get_session)):
+    async def get_authorization_token(self, authorization: str = Header(None)):
 
         if not authorization or not authorization.startswith('Bearer '):
             raise HTTPException(status_code=401, detail='Invalid authorization header')
@@ -94,25 +77,18 @@ class FilesStorageService:
         except JWTError:
             raise HTTPException(status_code=401, detail='Invalid token')
 
-        if not await self.is_valid_token(payload['sub'], db):
+        if not await session_store.is_active(payload):
             raise HTTPException(status_code=401, detail='Token has expired')
 
         return payload
 
-    async def is_valid_token(self, username: str, db: AsyncSession):
-        user = await db.execute(User.__table__.select().where(User.username == username))
-        user = user.fetchone()
-        if user is None or not user.access_token:
-            return False
-
-        if user.token_expiration_time and user.token_expiration_time < datetime.utcnow():
-            return False
-
-        return True
+    async def get_user_id(self, authorization: str) -> uuid.UUID:
+        payload = await self.get_authorization_token(authorization)
+        return uuid.UUID(payload['uid'])
 
     async def check_allowed_ip(self, request: Request):
         try:
-            real_ip = socket.gethostbyname(request.client.host)
+            real_ip = socket.gethostbyname(client_ip(request))
         except socket.gaierror:
             real_ip = '127.0.0.1'
         logger.debug(f'{real_ip=}')
@@ -122,7 +98,7 @@ class FilesStorageService:
             raise HTTPException(status_code=403, detail='Forbidden IP')
 
     async def register(self, username: str, password: str, db: AsyncSession):
-        hashed_password = self.pwd_context.hash(password)
+        hashed_password = await asyncio.to_thread(self.pwd_context.hash, password)
         user = User(username=username, hashed_password=hashed_password)
         db.add(user)
         await db.commit()
@@ -134,49 +110,89 @@ class FilesStorageService:
                           authorization: str = Header(None),
                           db: AsyncSession = Depends(get_session)
                           ):
-        payload = await self.get_authorization_token(authorization, db)
-        user_id = await self.get_user_id_from_db(payload['sub'], db)
-
-        file_id = str(uuid.uuid4())
+        user_id = await self.get_user_id(authorization)
 
         if path.endswith('/'):
             path += file.filename
-        full_path = f'{app_settings.storage_path}/{user_id}/{path}'.replace('//', '/')
-        os.makedirs('/'.join(full_path.split('/')[:-1]), exist_ok=True)
-        with open(full_path, 'wb') as f:
-            f.write(file.file.read())
+        file.file.seek(0, os.SEEK_END)
+        size = file.file.tell()
+        file.file.seek(0)
 
-        file_record = FileItem(
-            id=file_id,
-            name=file.filename,
-            created_at=datetime.utcnow(),
-            path=path,
-            size=file.file.tell(),
-            is_downloadable=True,
-            user_id=user_id
-        )
+        # the bytes go to a fresh blob before any lock is taken, the row only switches to it on commit
+        blob_id = str(uuid.uuid4())
+        volume = await asyncio.to_thread(storage_volumes.write_blob, file.file, blob_id, size)
 
-        db.add(file_record)
-        await db.commit()
+        try:
+            await change_feed.lock(db, user_id)
+            # the row lock keeps a concurrent rebalance from switching the blob under us
+            existing = await db.execute(
+                FileItem.__table__.select().where(
+                    FileItem.user_id == user_id, FileItem.path == path
+                ).with_for_update()
+            )
+            existing = existing.fetchone()
+            # a new file is named after its first blob
+            file_id = str(existing.id) if existing else blob_id
+
+            file_record = FileItem(
+                id=file_id,
+                name=file.filename,
+                created_at=datetime.utcnow(),
+                path=path,
+                size=size,
+                is_downloadable=True,
+                volume=volume,
+                user_id=user_id
+            )
+
+            if existing:
+                stmt = FileItem.__table__.update().where(FileItem.id == existing.id).values(
+                    name=file_record.name,
+                    created_at=file_record.created_at,
+                    size=size,
+                    volume=volume,
+                    blob_id=blob_id
+                )
+                await db.execute(stmt)
+            else:
+                db.add(file_record)
+            await change_feed.record(db, user_id, [
+                {'file_id': file_id, 'action': 'overwritten' if existing else 'created', 'path': path, 'size': size}
+            ])
+            await db.commit()
+        except BaseException:
+            os.remove(storage_volumes.blob_path(volume, blob_id))
+            raise
+        await change_feed.notify(user_id)
+
+        if existing:
+            old_path = storage_volumes.resolve(existing)
+            hot_file_cache.invalidate(old_path)
+            # share links of the old version keep working until they expire
+            if not await share_links.retire(existing, old_path):
+                try:
+                    os.remove(old_path)
+                except FileNotFoundError:
+                    pass
+            await share_links.sweep()
 
         return File(
             id=file_id,
             name=file.filename,
             created_at=file_record.created_at,
             path=path,
-            size=file.file.tell(),
+            size=size,
             is_downloadable=True
         )
 
-    @redis_cached_async(arg_slice=slice(1, 3))
-    async def download_file(self, file: str, authorization: str, db: AsyncSession):
-        payload = await self.get_authorization_token(authorization, db)
-        user_id = await self.get_user_id_from_db(payload['sub'], db)
-
+    @staticmethod
+    async def get_file_record(file: str, user_id, db: AsyncSession):
         if '-' in file and len(file) == 36:
             file_record = await db.execute(FileItem.__table__.select().where(FileItem.id == file))
         else:
-            file_record = await db.execute(FileItem.__table__.select().where(FileItem.path == file))
+            file_record = await db.execute(
+                FileItem.__table__.select().where(FileItem.user_id == user_id, FileItem.path == file)
+            )
 
         file_record = file_record.fetchone()
         if not file_record:
@@ -185,65 +201,385 @@ class FilesStorageService:
         if file_record.user_id != user_id:
             raise HTTPException(status_code=403, detail='Access denied')
 
-        file_path = f'{app_settings.storage_path}/{user_id}/{file_record.path}'.replace('//', '/')
-        return FileResponse(file_path)
+        return file_record
+
+    async def download_file(self, file: str, authorization: str, db: AsyncSession):
+        user_id = await self.get_user_id(authorization)
+
+        file_record = await self.get_file_record(file, user_id, db)
+
+        media_type = mimetypes.guess_type(file_record.path)[0] or 'text/plain'
+        try:
+            return hot_file_cache.get_response(storage_volumes.resolve(file_record), media_type)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail='File not found')
+
+    @staticmethod
+    def to_file(file_record) -> File:
+        return File(
+            id=str(file_record.id),
+            name=file_record.name,
+            created_at=file_record.created_at,
+            path=file_record.path,
+            size=file_record.size,
+            is_downloadable=file_record.is_downloadable
+        )
+
+    @staticmethod
+    async def check_path_is_free(path: str, user_id, db: AsyncSession):
+        existing = await db.execute(
+            FileItem.__table__.select().where(FileItem.user_id == user_id, FileItem.path == path)
+        )
+        if existing.fetchone():
+            raise HTTPException(status_code=409, detail=f'File {path} already exists')
+
+    @staticmethod
+    async def check_folder_is_free(source: str, destination: str, user_id, db: AsyncSession):
+        files = FileItem.__table__
+        other = files.alias()
+        new_path = literal(destination) + func.substr(files.c.path, len(source) + 1)
+        conflicts = await db.execute(
+            select(func.count()).select_from(
+                files.join(other, and_(other.c.user_id == files.c.user_id, other.c.path == new_path))
+            ).where(files.c.user_id == user_id, files.c.path.startswith(source, autoescape=True))
+        )
+        if conflicts.scalar():
+            raise HTTPException(status_code=409, detail=f'Files already exist in {destination}')
+
+    @staticmethod
+    def normalize_path(path: str) -> str:
+        if not path or not path.startswith('/'):
+            raise HTTPException(status_code=400, detail='Path must be absolute')
+        normalized = '/' + posixpath.normpath(path).lstrip('/')
+        if path.endswith('/') and normalized != '/':
+            normalized += '/'
+        return normalized
+
+    @staticmethod
+    async def remove_copies(copies: list):
+        def remove_blobs():
+            for copy in copies:
+                try:
+                    os.remove(storage_volumes.blob_path(copy['volume'], copy['id']))
+                except FileNotFoundError:
+                    pass
+
+        await asyncio.to_thread(remove_blobs)
+
+    @staticmethod
+    def folder_paths(source: str, destination: str):
+        if not destination.endswith('/'):
+            destination += '/'
+        if destination.startswith(source):
+            raise HTTPException(status_code=400, detail='Cannot place a folder inside itself')
+        return source, destination
+
+    async def adopt_legacy_files(self, condition, db: AsyncSession):
+        files = await db.execute(FileItem.__table__.select().where(condition, FileItem.volume.is_(None)))
+        for file_record in files.fetchall():
+            legacy_path = storage_volumes.legacy_path(file_record.user_id, file_record.path)
+            try:
+                volume = await asyncio.to_thread(storage_volumes.adopt_legacy, file_record)
+            except FileNotFoundError:
+                logger.warning(f'Legacy file {legacy_path} is missing, skipping')
+                continue
+            # each row is committed before its legacy file goes, so a failure leaves both consistent
+            result = await db.execute(
+                FileItem.__table__.update().where(
+                    FileItem.id == file_record.id, FileItem.volume.is_(None)
+                ).values(volume=volume)
+            )
+            await db.commit()
+            if not result.rowcount:
+                continue
+            hot_file_cache.invalidate(legacy_path)
+            try:
+                os.remove(legacy_path)
+            except FileNotFoundError:
+                pass
+
+    async def move_file(self, source: str, destination: str, authorization: str, db: AsyncSession):
+        user_id = await self.get_user_id(authorization)
+        destination = self.normalize_path(destination)
+
+        if source.endswith('/'):
+            return await self.move_folder(source, destination, user_id, db)
+
+        file_record = await self.get_file_record(source, user_id, db)
+        if destination.endswith('/'):
+            destination += os.path.basename(file_record.path)
+        await self.adopt_legacy_files(FileItem.id == file_record.id, db)
+
+        # the cursor lock serializes the user's writers, so the path stays free until commit
+        await change_feed.lock(db, user_id)
+        await self.check_path_is_free(destination, user_id, db)
+        await db.execute(
+            FileItem.__table__.update().where(FileItem.id == file_record.id).values(
+                path=destination,
+                name=os.path.basename(destination)
+            )
+        )
+        await change_feed.record(db, user_id, [{
+            'file_id': file_record.id,
+            'action': 'moved',
+            'path': destination,
+            'old_path': file_record.path,
+            'size': file_record.size
+        }])
+        await db.commit()
+        await change_feed.notify(user_id)
+
+        return self.to_file(await self.get_file_record(str(file_record.id), user_id, db))
+
+    async def move_folder(self, source: str, destination: str, user_id, db: AsyncSession):
+        source, destination = self.folder_paths(source, destination)
+        in_source = and_(FileItem.user_id == user_id, FileItem.path.startswith(source, autoescape=True))
+        await self.adopt_legacy_files(in_source, db)
+
+        await change_feed.lock(db, user_id)
+        await self.check_folder_is_free(source, destination, user_id, db)
+        new_path = literal(destination) + func.substr(FileItem.path, len(source) + 1)
+        await change_feed.record_bulk(db, user_id, 'moved', in_source, new_path)
+        result = await db.execute(FileItem.__table__.update().where(in_source).values(path=new_path))
+        await db.commit()
+        if not result.rowcount:
+            raise HTTPException(status_code=404, detail='Folder not found')
+        await change_feed.notify(user_id)
+
+        return {'detail': f'Moved {result.rowcount} files to {destination}', 'count': result.rowcount}
+
+    async def rename_file(self, source: str, name: str, authorization: str, db: AsyncSession):
+        if not name or '/' in name.strip('/'):
+            raise HTTPException(status_code=400, detail='Invalid name')
+
+        if source.endswith('/'):
+            destination = os.path.join(os.path.dirname(source.rstrip('/')), name.strip('/')) + '/'
+            return await self.move_file(source, destination, authorization, db)
+
+        # the source may be a file id, so the folder comes from the record
+        user_id = await self.get_user_id(authorization)
+        file_record = await self.get_file_record(source, user_id, db)
+        destination = os.path.join(os.path.dirname(file_record.path), name.strip('/'))
+        return await self.move_file(str(file_record.id), destination, authorization, db)
+
+    async def copy_file(self, source: str, destination: str, authorization: str, db: AsyncSession):
+        user_id = await self.get_user_id(authorization)
+        destination = self.normalize_path(destination)
+
+        if source.endswith('/'):
+            return await self.copy_folder(source, destination, user_id, db)
+
+        file_record = await self.get_file_record(source, user_id, db)
+        if destination.endswith('/'):
+            destination += os.path.basename(file_record.path)
+
+        copies = await self.copy_blobs([file_record], lambda path: destination)
+        copies[0]['name'] = os.path.basename(destination)
+        try:
+            await change_feed.lock(db, user_id)
+            await self.check_path_is_free(destination, user_id, db)
+            await db.execute(FileItem.__table__.insert(), copies)
+            await change_feed.record(db, user_id, self.created_changes(copies))
+            await db.commit()
+        except BaseException:
+            await self.remove_copies(copies)
+            raise
+        await change_feed.notify(user_id)
+
+        return self.to_file(await self.get_file_record(str(copies[0]['id']), user_id, db))
+
+    async def copy_folder(self, source: str, destination: str, user_id, db: AsyncSession):
+        source, destination = self.folder_paths(source, destination)
+
+        files = await db.execute(
+            FileItem.__table__.select().where(
+                FileItem.user_id == user_id, FileItem.path.startswith(source, autoescape=True)
+            )
+        )
+        file_records = files.fetchall()
+        if not file_records:
+            raise HTTPException(status_code=404, detail='Folder not found')
+
+        # blobs are linked before any lock is taken, and dropped again if the copy cannot commit
+        copies = await self.copy_blobs(file_records, lambda path: destination + path[len(source):])
+        try:
+            await change_feed.lock(db, user_id)
+            await self.check_folder_is_free(source, destination, user_id, db)
+            await db.execute(FileItem.__table__.insert(), copies)
+            await change_feed.record(db, user_id, self.created_changes(copies))
+            await db.commit()
+        except BaseException:
+            await self.remove_copies(copies)
+            raise
+        await change_feed.notify(user_id)
+
+        return {'detail': f'Copied {len(copies)} files to {destination}', 'count': len(copies)}
+
+    @staticmethod
+    def created_changes(file_rows: list) -> list:
+        return [
+            {'file_id': file_row['id'], 'action': 'created', 'path': file_row['path'], 'size': file_row['size']}
+            for file_row in file_rows
+        ]
+
+    @staticmethod
+    async def copy_blobs(file_records, new_path) -> list:
+        def link_all():
+            return [
+                storage_volumes.link_blob(storage_volumes.resolve(file_record), file_id)
+                for file_record, file_id in zip(file_records, file_ids)
+            ]
+
+        file_ids = [uuid.uuid4() for _ in file_records]
+        volumes = await asyncio.to_thread(link_all)
+        created_at = datetime.utcnow()
+        return [
+            {
+                'id': file_id,
+                'name': file_record.name,
+                'created_at': created_at,
+                'path': new_path(file_record.path),
+                'size': file_record.size,
+                'is_downloadable': file_record.is_downloadable,
+                'volume': volume,
+                'user_id': file_record.user_id,
+            }
+            for file_record, file_id, volume in zip(file_records, file_ids, volumes)
+        ]
+
+    async def share_file(self, file: str, expire_minutes: int, authorization: str, db: AsyncSession):
+        if expire_minutes is not None and not 0 < expire_minutes <= app_settings.share_link_max_expire_minutes:
+            raise HTTPException(status_code=400, detail='Invalid expiration time')
+
+        user_id = await self.get_user_id(authorization)
+
+        if file.endswith('/'):
+            condition = and_(FileItem.user_id == user_id, FileItem.path.startswith(file, autoescape=True))
+        else:
+            file_record = await self.get_file_record(file, user_id, db)
+            condition = FileItem.id == file_record.id
+        # nginx serves blobs straight from the volumes, legacy files are not there yet
+        await self.adopt_legacy_files(condition, db)
+
+        files = await db.execute(
+            FileItem.__table__.select().where(
+                condition, FileItem.is_downloadable.is_(True), FileItem.volume.isnot(None)
+            )
+        )
+        file_records = files.fetchall()
+        if not file_records:
+            raise HTTPException(status_code=404, detail='File not found')
+        if not all(share_links.can_serve(file_record) for file_record in file_records):
+            raise HTTPException(status_code=409, detail='File is on a volume that cannot be shared')
+
+        return await share_links.mint(file_records, user_id, expire_minutes)
+
+    async def revoke_share(self, sid: str, authorization: str, db: AsyncSession):
+        user_id = await self.get_user_id(authorization)
+
+        if await share_links.get_owner(sid) != str(user_id):
+            raise HTTPException(status_code=404, detail='Share link not found')
+
+        await share_links.revoke(sid)
+        return {'detail': 'Share link revoked'}
+
+    async def check_share(self, sid: str):
+        if not share_links.is_valid_sid(sid) or await share_links.is_revoked(sid):
+            raise HTTPException(status_code=403, detail='Share link revoked')
+        return {'detail': 'OK'}
+
+    async def delete_file(self, file: str, authorization: str, db: AsyncSession):
+        user_id = await self.get_user_id(authorization)
+
+        if file.endswith('/'):
+            condition = and_(FileItem.user_id == user_id, FileItem.path.startswith(file, autoescape=True))
+        else:
+            file_record = await self.get_file_record(file, user_id, db)
+            condition = FileItem.id == file_record.id
+
+        # record_bulk holds the cursor lock from here on, so the deleted rows are the recorded ones
+        await change_feed.record_bulk(db, user_id, 'deleted', condition)
+        files = await db.execute(FileItem.__table__.delete().where(condition).returning(*FileItem.__table__.c))
+        file_records = files.fetchall()
+        if not file_records:
+            raise HTTPException(status_code=404, detail='File not found')
+        await db.commit()
+        await change_feed.notify(user_id)
+
+        def remove_blobs():
+            for file_record in file_records:
+                blob_path = storage_volumes.resolve(file_record)
+                hot_file_cache.invalidate(blob_path)
+                try:
+                    os.remove(blob_path)
+                except FileNotFoundError:
+                    pass
+
+        await asyncio.to_thread(remove_blobs)
+        return {'detail': f'Deleted {len(file_records)} files', 'count': len(file_records)}
+
+    async def get_changes(self, cursor: Optional[int], limit: int, wait: float, authorization: str,
+                          db: AsyncSession) -> ChangesPage:
+        user_id = await self.get_user_id(authorization)
+
+        if cursor is None:
+            # a new client takes the cursor first and then lists its files
+            return ChangesPage(cursor=await change_feed.current_cursor(db, user_id), changes=[], has_more=False)
+
+        wait = min(wait, app_settings.changes_max_wait_seconds)
+        if wait <= 0:
+            return await change_feed.since(db, user_id, cursor, limit)
+
+        async with change_feed.subscribe(user_id) as wait_for_change:
+            page = await change_feed.since(db, user_id, cursor, limit)
+            await db.rollback()
+            if not page.changes and await wait_for_change(wait):
+                page = await change_feed.since(db, user_id, cursor, limit)
+        return page
+
+    async def stream_changes(self, cursor: Optional[int], last_event_id: Optional[str], authorization: str,
+                             db: AsyncSession) -> StreamingResponse:
+        user_id = await self.get_user_id(authorization)
+
+        if last_event_id and last_event_id.isdigit():
+            cursor = int(last_event_id)
+        if cursor is None:
+            cursor = await change_feed.current_cursor(db, user_id)
+
+        async def events():
+            page_cursor = cursor
+            async with change_feed.subscribe(user_id) as wait_for_change:
+                while True:
+                    page = await change_feed.since(db, user_id, page_cursor, app_settings.changes_page_size)
+                    # do not keep a transaction open while idle
+                    await db.rollback()
+                    for change in page.changes:
+                        yield f'id: {change.seq}\nevent: change\ndata: {change.json()}\n\n'
+                    page_cursor = page.cursor
+                    if not page.has_more and not await wait_for_change(app_settings.changes_heartbeat_seconds):
+                        yield ': keepalive\n\n'
+
+        return StreamingResponse(events(), media_type='text/event-stream', headers={'Cache-Control': 'no-cache'})
 
     async def get_files(self, authorization: str = Header(None), db: AsyncSession = Depends(get_session)):
-        payload = await self.get_authorization_token(authorization, db)
-        user_id = await self.get_user_id_from_db(payload["sub"], db)
+        user_id = await self.get_user_id(authorization)
 
         files = await db.execute(FileItem.__table__.select().where(FileItem.user_id == user_id))
         if file_records := files.fetchall():
-            return [
-                File(
-                    id=str(file_record.id),
-                    name=file_record.name,
-                    created_at=file_record.created_at,
-                    path=file_record.path,
-                    size=file_record.size,
-                    is_downloadable=file_record.is_downloadable
-                )
-                for file_record in file_records
-            ]
+            return [self.to_file(file_record) for file_record in file_records]
         else:
             raise HTTPException(status_code=404, detail='No files found for this user')
 
-    async def ping_services(self, db: AsyncSession):
-        db_ping_time = await self.ping_database(db)
-        cache_ping_time = self.ping_cache()
-        storage_ping_time = self.ping_storage()
-
-        return {
-            "db": db_ping_time,
-            "cache": cache_ping_time,
-            "storage": storage_ping_time,
-        }
+    async def ping_services(self):
+        return await health_prober.latencies()
 
-    async def ping_database(self, db: AsyncSession):
-        try:
-            start_time = time.time()
-            await db.execute('SELECT 1')
-            end_time = time.time()
-            return end_time - start_time
-        except DBAPIError:
-            return None
-
-    def ping_storage(self):
-        try:
-            start_time = time.time()
-            with open(f'{app_settings.storage_path}/testfile.txt', 'w') as f:
-                f.write('test')
-            end_time = time.time()
-            return end_time - start_time
-        except (PermissionError, IOError):
-            return None
-
-    def ping_cache(self):
-        try:
-            start_time = time.time()
-            redis_client.ping()
-            end_time = time.time()
-            return end_time - start_time
-        except (redis.ConnectionError, redis.ResponseError):
-            return None
+    async def liveness(self):
+        if not health_prober.is_alive():
+            raise HTTPException(status_code=503, detail='Health prober is not running')
+        return {'status': 'alive'}
 
+    async def readiness(self):
+        report = await health_prober.report()
+        if not report['ready']:
+            return ORJSONResponse(status_code=503, content=report)
+        return report
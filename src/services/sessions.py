@@ -0,0 +1,109 @@
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta
+
+from jose import jwt
+
+from src.core.config import app_settings
+from src.services.redis import async_redis_client
+
+
+class SessionStore:
+    """Login sessions kept in Redis with native TTLs.
+
+    Access tokens are short-lived JWTs carrying the session id; a request is
+    authorized as long as its session key exists and belongs to the user's
+    current generation. Bumping the generation revokes every session of the
+    user in O(1), deleting one key revokes a single session.
+    """
+
+    session_key = 'session:{sid}'
+    refresh_key = 'refresh:{digest}'
+    generation_key = 'session_gen:{user_id}'
+
+    def __init__(self, access_ttl: int = None, session_ttl: int = None):
+        self.access_ttl = app_settings.access_token_expire_minutes * 60 if access_ttl is None else access_ttl
+        self.session_ttl = app_settings.refresh_token_expire_minutes * 60 if session_ttl is None else session_ttl
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def create_access_token(self, sid: str, user_id: str, username: str) -> str:
+        to_encode = {
+            'sub': username,
+            'uid': user_id,
+            'sid': sid,
+            'exp': datetime.utcnow() + timedelta(seconds=self.access_ttl),
+        }
+        return jwt.encode(to_encode, app_settings.secret_token, algorithm=app_settings.algorithm)
+
+    async def _issue(self, sid: str, user_id: str, username: str, generation: int) -> dict:
+        refresh_token = secrets.token_urlsafe(32)
+        refresh_digest = self.digest(refresh_token)
+        session_key = self.session_key.format(sid=sid)
+        async with async_redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(session_key, mapping={
+                'user_id': user_id,
+                'username': username,
+                'generation': generation,
+                'refresh': refresh_digest,
+            })
+            pipe.expire(session_key, self.session_ttl)
+            pipe.set(self.refresh_key.format(digest=refresh_digest), sid, ex=self.session_ttl)
+            await pipe.execute()
+
+        return {
+            'access_token': self.create_access_token(sid, user_id, username),
+            'refresh_token': refresh_token,
+            'token_type': 'bearer',
+        }
+
+    async def create(self, user_id, username: str) -> dict:
+        generation = await async_redis_client.get(self.generation_key.format(user_id=user_id))
+        return await self._issue(uuid.uuid4().hex, str(user_id), username, int(generation or 0))
+
+    async def _current_session(self, sid: str):
+        session = await async_redis_client.hgetall(self.session_key.format(sid=sid))
+        if not session:
+            return None
+        session = {key.decode(): value.decode() for key, value in session.items()}
+        generation = await async_redis_client.get(self.generation_key.format(user_id=session['user_id']))
+        if int(session['generation']) != int(generation or 0):
+            return None
+        return session
+
+    async def is_active(self, payload: dict) -> bool:
+        if 'sid' not in payload or 'uid' not in payload:
+            return False
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            pipe.hget(self.session_key.format(sid=payload['sid']), 'generation')
+            pipe.get(self.generation_key.format(user_id=payload['uid']))
+            session_generation, generation = await pipe.execute()
+        return session_generation is not None and int(session_generation) == int(generation or 0)
+
+    async def refresh(self, refresh_token: str):
+        # GETDEL makes every refresh token single-use
+        sid = await async_redis_client.getdel(self.refresh_key.format(digest=self.digest(refresh_token)))
+        if sid is None:
+            return None
+        sid = sid.decode()
+        session = await self._current_session(sid)
+        if session is None:
+            return None
+        return await self._issue(sid, session['user_id'], session['username'], int(session['generation']))
+
+    async def revoke(self, sid: str):
+        session_key = self.session_key.format(sid=sid)
+        refresh_digest = await async_redis_client.hget(session_key, 'refresh')
+        keys = [session_key]
+        if refresh_digest:
+            keys.append(self.refresh_key.format(digest=refresh_digest.decode()))
+        await async_redis_client.delete(*keys)
+
+    async def revoke_all(self, user_id):
+        await async_redis_client.incr(self.generation_key.format(user_id=user_id))
+
+
+session_store = SessionStore()
@@ -0,0 +1,143 @@
+import asyncio
+import base64
+import hashlib
+import os
+import re
+import time
+import uuid
+from logging import getLogger
+from urllib.parse import quote
+
+from src.core.config import app_settings
+from src.services.redis import async_redis_client
+from src.services.storage import storage_volumes
+
+logger = getLogger(__name__)
+
+# Pins a blob until ARGV[1] (unix time), never shortening an existing pin.
+PIN_SCRIPT = """
+local expires = tonumber(ARGV[1])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if expires > current then
+    redis.call('SET', KEYS[1], expires, 'EX', ARGV[2])
+end
+"""
+
+
+class ShareLinks:
+    """Mints expiring download links that nginx verifies with ``secure_link``.
+
+    nginx only understands an MD5 digest over a string that embeds the secret,
+    so the signature is ``md5("{expires}{uri}{sid}:{name} {secret}")`` as
+    configured in services/nginx.conf. The sid has a fixed format and the name
+    is percent-encoded, so neither can borrow characters from the other.
+    Every link belongs to a share id (``sid``) that can be put on a Redis
+    denylist until the link expires.
+
+    Links point at the blob itself, so shared blobs are pinned until their
+    last link expires: the rebalancer leaves them in place and an overwrite
+    retires the old blob instead of removing it, see ``sweep``.
+    """
+
+    owner_key = 'share:owner:{sid}'
+    revoked_key = 'share:revoked:{sid}'
+    pin_key = 'share:pin:{blob_id}'
+    retired_key = 'share:retired'
+
+    def __init__(self, prefix: str = None, secret: str = None, served_volumes: int = None):
+        self.prefix = (app_settings.share_link_prefix if prefix is None else prefix).rstrip('/')
+        self.secret = app_settings.secret_token if secret is None else secret
+        self.served_volumes = app_settings.share_link_volumes if served_volumes is None else served_volumes
+        self.pin_script = async_redis_client.register_script(PIN_SCRIPT)
+
+    def check_volumes(self):
+        unserved = storage_volumes.volumes[self.served_volumes:]
+        if unserved:
+            logger.error(f'Volumes {unserved} are not mounted into nginx, files on them cannot be shared; '
+                         f'mount them as /opt/volumes/<index>/ and raise SHARE_LINK_VOLUMES')
+
+    def can_serve(self, file_record) -> bool:
+        if file_record.volume not in storage_volumes.volumes:
+            return False
+        return storage_volumes.volumes.index(file_record.volume) < self.served_volumes
+
+    @staticmethod
+    def is_valid_sid(sid: str) -> bool:
+        return re.fullmatch(r'[0-9a-f]{32}', sid or '') is not None
+
+    def sign(self, uri: str, expires: int, name: str, sid: str) -> str:
+        digest = hashlib.md5(f'{expires}{uri}{sid}:{name} {self.secret}'.encode()).digest()
+        return base64.urlsafe_b64encode(digest).decode().rstrip('=')
+
+    def build_url(self, file_record, expires: int, sid: str) -> str:
+        volume_index = storage_volumes.volumes.index(file_record.volume)
+        uri = f'{self.prefix}/{volume_index}/{storage_volumes.blob_key(storage_volumes.blob_of(file_record))}'
+        name = quote(file_record.name or '', safe='')
+        md5 = self.sign(uri, expires, name, sid)
+        return f'{app_settings.share_link_base_url}{uri}?md5={md5}&expires={expires}&name={name}&sid={sid}'
+
+    async def mint(self, file_records: list, user_id, expire_minutes: int = None) -> dict:
+        expire_minutes = expire_minutes or app_settings.share_link_expire_minutes
+        ttl = expire_minutes * 60
+        expires = int(time.time()) + ttl
+        sid = uuid.uuid4().hex
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            pipe.set(self.owner_key.format(sid=sid), str(user_id), ex=ttl)
+            for file_record in file_records:
+                pin_key = self.pin_key.format(blob_id=storage_volumes.blob_of(file_record))
+                await self.pin_script(keys=[pin_key], args=[expires, ttl], client=pipe)
+            await pipe.execute()
+        return {
+            'sid': sid,
+            'expires': expires,
+            'links': [
+                {'path': file_record.path, 'url': self.build_url(file_record, expires, sid)}
+                for file_record in file_records
+            ],
+        }
+
+    async def get_owner(self, sid: str):
+        owner = await async_redis_client.get(self.owner_key.format(sid=sid))
+        return owner.decode() if owner else None
+
+    async def revoke(self, sid: str):
+        key = self.owner_key.format(sid=sid)
+        # the denylist entry only has to outlive the links themselves
+        ttl = await async_redis_client.ttl(key)
+        if ttl > 0:
+            await async_redis_client.set(self.revoked_key.format(sid=sid), 1, ex=ttl)
+        await async_redis_client.delete(key)
+
+    async def is_revoked(self, sid: str) -> bool:
+        return bool(await async_redis_client.exists(self.revoked_key.format(sid=sid)))
+
+    async def is_pinned(self, file_record) -> bool:
+        return bool(await async_redis_client.exists(self.pin_key.format(blob_id=storage_volumes.blob_of(file_record))))
+
+    async def retire(self, file_record, blob_path: str) -> bool:
+        """Queues the replaced blob of a shared file for removal once its
+        links expire. Returns False if nothing links to it."""
+        pinned_until = await async_redis_client.get(self.pin_key.format(blob_id=storage_volumes.blob_of(file_record)))
+        if pinned_until is None:
+            return False
+        await async_redis_client.zadd(self.retired_key, {blob_path: int(pinned_until)})
+        return True
+
+    async def sweep(self):
+        """Removes retired blobs whose links have expired."""
+        blob_paths = await async_redis_client.zrangebyscore(self.retired_key, '-inf', int(time.time()))
+        if not blob_paths:
+            return
+
+        def remove_blobs():
+            for blob_path in blob_paths:
+                try:
+                    os.remove(blob_path)
+                except FileNotFoundError:
+                    pass
+
+        await asyncio.to_thread(remove_blobs)
+        await async_redis_client.zrem(self.retired_key, *blob_paths)
+
+
+share_links = ShareLinks()
@@ -0,0 +1,209 @@
+import asyncio
+import os
+import random
+import shutil
+import uuid
+from logging import getLogger
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import app_settings
+from src.models.entities import FileItem
+
+logger = getLogger(__name__)
+
+
+class StorageVolumes:
+    """Places file blobs on configured volumes in a hashed fan-out layout.
+
+    Blobs are stored as ``{volume}/ab/cd/<file_id>`` so directory sizes stay
+    bounded no matter how users organize their logical paths.
+    """
+
+    def __init__(self, volumes: list = None, fanout_depth: int = None):
+        volumes = volumes or app_settings.storage_volumes or [app_settings.storage_path]
+        self.volumes = [volume.rstrip('/') or '/' for volume in volumes]
+        self.fanout_depth = app_settings.storage_fanout_depth if fanout_depth is None else fanout_depth
+
+    @staticmethod
+    def free_space(volume: str) -> int:
+        try:
+            return shutil.disk_usage(volume).free
+        except OSError:
+            return 0
+
+    @staticmethod
+    def free_ratio(volume: str) -> float:
+        try:
+            usage = shutil.disk_usage(volume)
+        except OSError:
+            return 0.0
+        return usage.free / usage.total if usage.total else 0.0
+
+    def choose_volume(self, size: int = 0) -> str:
+        weights = [max(self.free_space(volume) - size, 0) for volume in self.volumes]
+        if not any(weights):
+            raise OSError('No storage volume has enough free space')
+        return random.choices(self.volumes, weights=weights)[0]
+
+    def blob_key(self, blob_id: str) -> str:
+        blob_id = str(blob_id)
+        digest = blob_id.replace('-', '')
+        shards = [digest[i * 2:i * 2 + 2] for i in range(self.fanout_depth)]
+        return '/'.join(shards + [blob_id])
+
+    def blob_path(self, volume: str, blob_id: str) -> str:
+        return os.path.join(volume, self.blob_key(blob_id))
+
+    @staticmethod
+    def legacy_path(user_id, path: str) -> str:
+        return f'{app_settings.storage_path}/{user_id}/{path}'.replace('//', '/')
+
+    @staticmethod
+    def blob_of(file_record):
+        return file_record.blob_id or file_record.id
+
+    def resolve(self, file_record) -> str:
+        if file_record.volume is None:
+            return self.legacy_path(file_record.user_id, file_record.path)
+        return self.blob_path(file_record.volume, self.blob_of(file_record))
+
+    def write_blob(self, fileobj, blob_id: str, size: int = 0) -> str:
+        volume = self.choose_volume(size)
+        blob_path = self.blob_path(volume, blob_id)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        tmp_path = f'{blob_path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as f:
+            shutil.copyfileobj(fileobj, f)
+        os.replace(tmp_path, blob_path)
+        return volume
+
+    def copy_blob(self, source_path: str, target_volume: str, blob_id: str) -> str:
+        target_path = self.blob_path(target_volume, blob_id)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        tmp_path = f'{target_path}.{uuid.uuid4().hex}.tmp'
+        # copyfile lets the kernel move the bytes (sendfile/copy_file_range)
+        shutil.copyfile(source_path, tmp_path)
+        with open(tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, target_path)
+        return target_path
+
+    def volume_for(self, path: str):
+        device = os.stat(path).st_dev
+        for volume in self.volumes:
+            try:
+                if os.stat(volume).st_dev == device:
+                    return volume
+            except OSError:
+                continue
+        return None
+
+    def link_blob(self, source_path: str, blob_id: str) -> str:
+        """Creates blob ``blob_id`` with the contents of ``source_path``.
+
+        A hardlink is used when the source lives on one of the volumes, so no
+        bytes are copied; overwrites replace the blob, which keeps both copies
+        independent.
+        """
+        volume = self.volume_for(source_path)
+        if volume is not None:
+            target_path = self.blob_path(volume, blob_id)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            try:
+                os.link(source_path, target_path)
+                return volume
+            except OSError:
+                pass
+        volume = volume or self.choose_volume(os.path.getsize(source_path))
+        self.copy_blob(source_path, volume, blob_id)
+        return volume
+
+    def adopt_legacy(self, file_record) -> str:
+        """Links a file stored under the legacy per-user tree into the blob
+        layout, so that its logical path can change freely. The legacy file
+        stays in place until the row points at the blob."""
+        return self.link_blob(self.legacy_path(file_record.user_id, file_record.path), file_record.id)
+
+    def is_balanced(self, threshold: float) -> bool:
+        ratios = [self.free_ratio(volume) for volume in self.volumes]
+        return max(ratios) - min(ratios) <= threshold
+
+    async def rebalance(self, db: AsyncSession, threshold: float = None, batch_size: int = 100,
+                        is_pinned=None) -> int:
+        """Moves blobs from the fullest volume to the emptiest one until free
+        space ratios differ by at most ``threshold``. Blobs for which the
+        ``is_pinned`` coroutine returns True, e.g. shared ones, stay in place.
+
+        Each blob is copied first and its row switched to the new volume
+        before the old copy is removed, so downloads keep working meanwhile.
+        The switch only applies if the row still points at the copied blob;
+        otherwise the file was overwritten or moved and the copy is dropped.
+        """
+        threshold = app_settings.storage_rebalance_threshold if threshold is None else threshold
+        moved = 0
+        last_target = None
+        while len(self.volumes) > 1 and not self.is_balanced(threshold):
+            source = min(self.volumes, key=self.free_ratio)
+            target = max(self.volumes, key=self.free_ratio)
+            if source == last_target:
+                # blobs are too large to even out the volumes any further
+                break
+            last_target = target
+            files = await db.execute(
+                FileItem.__table__.select().where(FileItem.volume == source).limit(batch_size)
+            )
+            file_records = files.fetchall()
+            if not file_records:
+                break
+
+            moved_before = moved
+            for file_record in file_records:
+                if is_pinned is not None and await is_pinned(file_record):
+                    continue
+                blob_id = self.blob_of(file_record)
+                source_path = self.blob_path(source, blob_id)
+                try:
+                    target_path = await asyncio.to_thread(self.copy_blob, source_path, target, blob_id)
+                except FileNotFoundError:
+                    logger.warning(f'Blob {source_path} is missing, skipping')
+                    continue
+
+                same_blob = FileItem.blob_id.is_(None) if file_record.blob_id is None \
+                    else FileItem.blob_id == file_record.blob_id
+                stmt = FileItem.__table__.update().where(
+                    FileItem.id == file_record.id, FileItem.volume == source, same_blob
+                ).values(volume=target)
+                result = await db.execute(stmt)
+                await db.commit()
+
+                if not result.rowcount:
+                    os.remove(target_path)
+                    continue
+                try:
+                    os.remove(source_path)
+                except FileNotFoundError:
+                    pass
+                moved += 1
+                if self.is_balanced(threshold):
+                    break
+            if moved == moved_before:
+                break
+
+        logger.info(f'Rebalanced {moved} blobs across {len(self.volumes)} volumes')
+        return moved
+
+
+storage_volumes = StorageVolumes()
+
+
+if __name__ == '__main__':
+    from src.db.db import async_session
+    from src.services.sharing import share_links
+
+    async def main():
+        async with async_session() as session:
+            await storage_volumes.rebalance(session, is_pinned=share_links.is_pinned)
+        await share_links.sweep()
+
+    asyncio.run(main())
@@ -0,0 +1,52 @@
+"""Measures login throughput of a running service under concurrency.
+
+    python -m src.tests.bench_login --url http://localhost/api/v1 --concurrency 50 --requests 500
+
+Raise the ``auth`` entry of RATE_LIMITS first, otherwise most logins get 429.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str, latencies: list):
+    start_time = time.perf_counter()
+    response = await client.post('/auth', params={'username': username, 'password': password})
+    latencies.append(time.perf_counter() - start_time)
+    return response.status_code
+
+
+async def main(url: str, concurrency: int, requests: int):
+    username, password = f'bench-{uuid.uuid4().hex[:8]}', uuid.uuid4().hex
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        response = await client.post('/register', params={'username': username, 'password': password})
+        response.raise_for_status()
+
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def limited_login():
+            async with semaphore:
+                return await login(client, username, password, latencies)
+
+        start_time = time.perf_counter()
+        statuses = await asyncio.gather(*(limited_login() for _ in range(requests)))
+        elapsed = time.perf_counter() - start_time
+
+    latencies.sort()
+    print(f'logins: {requests}, concurrency: {concurrency}, errors: {sum(s != 200 for s in statuses)}')
+    print(f'throughput: {requests / elapsed:.1f} logins/s')
+    print(f'p50: {latencies[len(latencies) // 2] * 1000:.1f} ms, '
+          f'p99: {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://localhost/api/v1')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.concurrency, args.requests))
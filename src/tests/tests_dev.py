@@ -1,5 +1,11 @@
+import os
+import uuid
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
 import pytest
 from asyncpg import InvalidCatalogNameError
+from fastapi import Request
 from fastapi.testclient import TestClient
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
@@ -11,6 +17,9 @@ from src.models.base import Base
 from src.db.db import get_session
 from src.core.config import app_settings
 from src.main import app
+from src.services.ratelimit import client_ip
+from src.services.sharing import share_links
+from src.services.storage import storage_volumes
 
 TEST_DATABASE_DSN = f'{app_settings.database_dsn}_test'
 tables_created = False
@@ -47,7 +56,8 @@ test_file_id = ''
 
 @pytest.fixture(scope='session')
 def client():
-    return TestClient(app)
+    with TestClient(app) as test_client:
+        yield test_client
 
 
 def test_ping_services(client):
@@ -56,6 +66,16 @@ def test_ping_services(client):
     assert len(response.json()) == 3
 
 
+def test_ping_ready(client):
+    response = client.get('/api/v1/ping/ready')
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data['ready']
+    assert set(data['services']) == {'db', 'cache', 'storage'}
+    assert 'p95_us' in data['services']['db']
+
+
 def test_register_user(client):
     response = client.post('/api/v1/register', params={'username': credentials[0], 'password': credentials[1]})
     assert response.status_code == 200
@@ -138,6 +158,8 @@ def test_download_file_id(client):
     assert response.status_code == 200
     assert response.headers.get("content-type") == "text/plain; charset=utf-8"
     assert response.content == b"Sample file content 1"
+    assert response.headers.get("etag")
+    assert response.headers.get("last-modified")
 
 
 def test_download_file_name(client):
@@ -150,3 +172,233 @@ def test_download_file_name(client):
     assert response.status_code == 200
     assert response.headers.get("content-type") == "text/plain; charset=utf-8"
     assert response.content == b"Sample file content 2"
+
+
+def test_download_overwritten_file(client):
+    file_data = ('sample3.txt', 'Sample file content 3', 'text/plain')
+    response = client.post(
+        url='/api/v1/files/upload',
+        headers={'Authorization': f'Bearer {access_token}'},
+        params={'path': '/upload-folder/sample_name.txt'},
+        files={'file': file_data},
+    )
+    assert response.status_code == 200
+
+    response = client.get(
+        url=f"/api/v1/files/download",
+        params={"file": "/upload-folder/sample_name.txt"},
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+
+    assert response.status_code == 200
+    assert response.content == b"Sample file content 3"
+
+
+def test_copy_folder(client):
+    response = client.post(
+        url='/api/v1/files/copy',
+        headers={'Authorization': f'Bearer {access_token}'},
+        params={'source': '/upload-folder/', 'destination': '/copy-folder/'},
+    )
+
+    assert response.status_code == 200
+    assert response.json()['count'] == 2
+
+
+def test_move_file(client):
+    response = client.post(
+        url='/api/v1/files/move',
+        headers={'Authorization': f'Bearer {access_token}'},
+        params={'source': '/copy-folder/sample_name.txt', 'destination': '/moved-folder/'},
+    )
+
+    assert response.status_code == 200
+    assert response.json()['path'] == '/moved-folder/sample_name.txt'
+
+    response = client.get(
+        url=f"/api/v1/files/download",
+        params={"file": "/moved-folder/sample_name.txt"},
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+
+    assert response.status_code == 200
+    assert response.content == b"Sample file content 3"
+
+
+def test_move_file_conflict(client):
+    response = client.post(
+        url='/api/v1/files/move',
+        headers={'Authorization': f'Bearer {access_token}'},
+        params={'source': '/moved-folder/sample_name.txt', 'destination': '/upload-folder/sample_name.txt'},
+    )
+
+    assert response.status_code == 409
+
+
+def test_copy_file_conflict(client):
+    response = client.post(
+        url='/api/v1/files/copy',
+        headers={'Authorization': f'Bearer {access_token}'},
+        params={'source': '/moved-folder/sample_name.txt', 'destination': '/upload-folder/../upload-folder/sample_name.txt'},
+    )
+
+    assert response.status_code == 409
+
+
+def test_move_file_relative_destination(client):
+    response = client.post(
+        url='/api/v1/files/move',
+        headers={'Authorization': f'Bearer {access_token}'},
+        params={'source': '/moved-folder/sample_name.txt', 'destination': 'moved.txt'},
+    )
+
+    assert response.status_code == 400
+
+
+def test_rename_file_id(client):
+    response = client.post(
+        url='/api/v1/files/rename',
+        headers={'Authorization': f'Bearer {access_token}'},
+        params={'source': test_file_id, 'name': 'renamed.txt'},
+    )
+
+    assert response.status_code == 200
+    assert response.json()['id'] == test_file_id
+    assert response.json()['path'] == '/upload-folder/renamed.txt'
+
+
+def test_share_folder(client):
+    response = client.post(
+        url='/api/v1/share',
+        headers={'Authorization': f'Bearer {access_token}'},
+        params={'file': '/upload-folder/'},
+    )
+
+    assert response.status_code == 200
+
+    data = response.json()
+    assert len(data['links']) == 2
+    assert all('md5=' in link['url'] for link in data['links'])
+
+    response = client.get('/api/v1/share/check', params={'sid': data['sid']})
+    assert response.status_code == 200
+
+    response = client.post(
+        url='/api/v1/share/revoke',
+        headers={'Authorization': f'Bearer {access_token}'},
+        params={'sid': data['sid']},
+    )
+    assert response.status_code == 200
+
+    response = client.get('/api/v1/share/check', params={'sid': data['sid']})
+    assert response.status_code == 403
+
+
+def test_share_keeps_overwritten_blob(client):
+    response = client.post(
+        url='/api/v1/share',
+        headers={'Authorization': f'Bearer {access_token}'},
+        params={'file': '/upload-folder/sample_name.txt'},
+    )
+    assert response.status_code == 200
+
+    blob_key = urlparse(response.json()['links'][0]['url']).path.split('/', 3)[3]
+    blob_path = storage_volumes.blob_path(storage_volumes.volumes[0], blob_key.rsplit('/', 1)[1])
+    assert os.path.exists(blob_path)
+
+    response = client.post(
+        url='/api/v1/files/upload',
+        headers={'Authorization': f'Bearer {access_token}'},
+        params={'path': '/upload-folder/sample_name.txt'},
+        files={'file': ('sample4.txt', 'Sample file content 4', 'text/plain')},
+    )
+    assert response.status_code == 200
+    assert os.path.exists(blob_path)
+
+    assert not share_links.can_serve(SimpleNamespace(volume='/not-configured'))
+
+
+def test_share_link_sid_cannot_be_shifted(client):
+    uri, expires, name, sid = '/share/0/ab/cd/file', 1700000000, 'foo.txt', uuid.uuid4().hex
+    signature = share_links.sign(uri, expires, name, sid)
+    assert share_links.sign(uri, expires, name + sid, '') != signature
+    assert share_links.sign(uri, expires, name + sid[:4], sid[4:]) != signature
+
+    for shifted_sid in ('', sid[4:], f'{sid}x', '../' + sid[3:]):
+        response = client.get('/api/v1/share/check', params={'sid': shifted_sid})
+        assert response.status_code == 403
+
+
+def test_changes_since_cursor(client):
+    response = client.get(
+        url='/api/v1/files/changes',
+        headers={'Authorization': f'Bearer {access_token}'},
+        params={'cursor': 0},
+    )
+
+    assert response.status_code == 200
+
+    data = response.json()
+    actions = [change['action'] for change in data['changes']]
+    assert actions[:3] == ['created', 'created', 'overwritten']
+    assert 'moved' in actions
+    cursor = data['cursor']
+
+    response = client.delete(
+        url='/api/v1/files',
+        headers={'Authorization': f'Bearer {access_token}'},
+        params={'file': '/moved-folder/'},
+    )
+    assert response.status_code == 200
+
+    response = client.get(
+        url='/api/v1/files/changes',
+        headers={'Authorization': f'Bearer {access_token}'},
+        params={'cursor': cursor},
+    )
+
+    assert response.status_code == 200
+
+    changes = response.json()['changes']
+    assert [change['action'] for change in changes] == ['deleted']
+    assert changes[0]['path'] == '/moved-folder/sample_name.txt'
+
+
+def test_refresh_and_logout(client):
+    response = client.post('/api/v1/auth', params={'username': credentials[0], 'password': credentials[1]})
+    assert response.status_code == 200
+    refresh_token = response.json()['refresh_token']
+
+    response = client.post('/api/v1/auth/refresh', params={'refresh_token': refresh_token})
+    assert response.status_code == 200
+    session_token = response.json()['access_token']
+
+    response = client.post('/api/v1/auth/refresh', params={'refresh_token': refresh_token})
+    assert response.status_code == 401
+
+    response = client.post('/api/v1/auth/logout', headers={'Authorization': f'Bearer {session_token}'})
+    assert response.status_code == 200
+
+    response = client.get('/api/v1/files', headers={'Authorization': f'Bearer {session_token}'})
+    assert response.status_code == 401
+
+    response = client.get('/api/v1/files', headers={'Authorization': f'Bearer {access_token}'})
+    assert response.status_code == 200
+
+
+def test_auth_rate_limited(client):
+    for _ in range(20):
+        response = client.post('/api/v1/auth', params={'username': 'unknown-user', 'password': 'password'})
+        if response.status_code == 429:
+            break
+
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+
+def test_client_ip_trusts_only_proxies(monkeypatch):
+    request = Request({'type': 'http', 'headers': [(b'x-real-ip', b'10.0.0.7')], 'client': ('203.0.113.5', 4321)})
+    assert client_ip(request) == '203.0.113.5'
+
+    monkeypatch.setattr(app_settings, 'trusted_proxies', ['203.0.113.0/24'])
+    assert client_ip(request) == '10.0.0.7'
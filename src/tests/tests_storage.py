@@ -0,0 +1,174 @@
+import asyncio
+import os
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from asyncpg import InvalidCatalogNameError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlalchemy.util import greenlet_spawn
+from sqlalchemy_utils import database_exists, create_database
+
+from src.models.base import Base
+from src.models.entities import FileItem, User
+from src.core.config import app_settings
+from src.services import storage
+from src.services.storage import StorageVolumes
+
+TEST_DATABASE_DSN = f'{app_settings.database_dsn}_test'
+VOLUME_CAPACITY = 1000
+
+
+def used_bytes(volume: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(volume)
+        for name in names
+    )
+
+
+@pytest.fixture
+def volumes(tmp_path, monkeypatch):
+    # every volume pretends to hold VOLUME_CAPACITY bytes, so ratios follow the blobs
+    monkeypatch.setattr(
+        StorageVolumes, 'free_ratio',
+        staticmethod(lambda volume: (VOLUME_CAPACITY - used_bytes(volume)) / VOLUME_CAPACITY)
+    )
+    paths = [tmp_path / 'volume-a', tmp_path / 'volume-b']
+    for path in paths:
+        path.mkdir()
+    return StorageVolumes(volumes=[str(path) for path in paths], fanout_depth=2)
+
+
+async def run_rebalance(storage_volumes: StorageVolumes, blobs: dict, **kwargs):
+    """Stores ``blobs`` (volume -> list of sizes, None for a missing blob) as
+    rows of a fresh user, rebalances and returns the moved count and rows."""
+    engine = create_async_engine(TEST_DATABASE_DSN, poolclass=NullPool, future=True)
+    try:
+        await greenlet_spawn(database_exists, engine.url)
+    except InvalidCatalogNameError:
+        await greenlet_spawn(create_database, engine.url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    user_id = uuid.uuid4()
+    try:
+        async with async_session() as session:
+            session.add(User(id=user_id, username=f'storage-{user_id.hex[:16]}', hashed_password=''))
+            await session.flush()
+            for volume, sizes in blobs.items():
+                for i, size in enumerate(sizes):
+                    file_id = uuid.uuid4()
+                    session.add(FileItem(
+                        id=file_id, name=f'{i}.bin', path=f'/{volume}/{i}.bin', size=size or 0,
+                        volume=volume, user_id=user_id
+                    ))
+                    if size is not None:
+                        blob_path = storage_volumes.blob_path(volume, file_id)
+                        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                        with open(blob_path, 'wb') as f:
+                            f.write(b'x' * size)
+            await session.commit()
+
+            moved = await storage_volumes.rebalance(session, **kwargs)
+
+            files = await session.execute(FileItem.__table__.select().where(FileItem.user_id == user_id))
+            return moved, files.fetchall()
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(User.__table__.delete().where(User.id == user_id))
+        await engine.dispose()
+
+
+def test_blob_path_fanout():
+    blob_id = uuid.UUID('abcdef01-2345-6789-abcd-ef0123456789')
+
+    assert StorageVolumes(volumes=['/data/'], fanout_depth=2).blob_path('/data', blob_id) == \
+        f'/data/ab/cd/{blob_id}'
+    assert StorageVolumes(volumes=['/data'], fanout_depth=3).blob_key(blob_id) == f'ab/cd/ef/{blob_id}'
+    assert StorageVolumes(volumes=['/data'], fanout_depth=0).blob_key(blob_id) == str(blob_id)
+
+
+def test_choose_volume_weighted(monkeypatch):
+    free_space = {'/a': 100, '/b': 300, '/c': 50}
+    monkeypatch.setattr(StorageVolumes, 'free_space', staticmethod(free_space.get))
+    calls = []
+
+    def choices(population, weights):
+        calls.append(weights)
+        return [population[weights.index(max(weights))]]
+
+    monkeypatch.setattr(storage.random, 'choices', choices)
+    storage_volumes = StorageVolumes(volumes=list(free_space))
+
+    assert storage_volumes.choose_volume(80) == '/b'
+    # the blob must fit, so a volume with less room than its size is never picked
+    assert calls[-1] == [20, 220, 0]
+
+    with pytest.raises(OSError):
+        storage_volumes.choose_volume(400)
+
+
+def test_resolve_legacy_fallback():
+    storage_volumes = StorageVolumes(volumes=['/data'], fanout_depth=2)
+    file_id, blob_id, user_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    file_record = SimpleNamespace(id=file_id, blob_id=None, volume=None, user_id=user_id, path='/docs/a.txt')
+
+    assert storage_volumes.resolve(file_record) == storage_volumes.legacy_path(user_id, '/docs/a.txt')
+
+    file_record.volume = '/data'
+    assert storage_volumes.resolve(file_record) == storage_volumes.blob_path('/data', file_id)
+
+    file_record.blob_id = blob_id
+    assert storage_volumes.resolve(file_record) == storage_volumes.blob_path('/data', blob_id)
+
+
+def test_rebalance_moves_blobs(volumes):
+    volume_a, volume_b = volumes.volumes
+    moved, file_records = asyncio.run(run_rebalance(volumes, {volume_a: [100] * 4}, threshold=0.1))
+
+    assert moved == 2
+    assert sorted(file_record.volume for file_record in file_records) == [volume_a] * 2 + [volume_b] * 2
+    for file_record in file_records:
+        other_volume = volume_b if file_record.volume == volume_a else volume_a
+        assert os.path.getsize(volumes.resolve(file_record)) == 100
+        assert not os.path.exists(volumes.blob_path(other_volume, file_record.id))
+    assert volumes.is_balanced(0.1)
+
+
+def test_rebalance_stops_on_missing_blob(volumes):
+    volume_a, volume_b = volumes.volumes
+    with open(os.path.join(volume_a, 'filler'), 'wb') as f:
+        f.write(b'x' * 400)
+    moved, file_records = asyncio.run(run_rebalance(volumes, {volume_a: [None, None]}, threshold=0.1))
+
+    assert moved == 0
+    assert all(file_record.volume == volume_a for file_record in file_records)
+    assert used_bytes(volume_b) == 0
+
+
+def test_rebalance_skips_pinned(volumes):
+    volume_a, volume_b = volumes.volumes
+
+    async def is_pinned(file_record):
+        return True
+
+    moved, file_records = asyncio.run(
+        run_rebalance(volumes, {volume_a: [100] * 4}, threshold=0.1, is_pinned=is_pinned)
+    )
+
+    assert moved == 0
+    assert all(file_record.volume == volume_a for file_record in file_records)
+
+
+def test_rebalance_stops_when_uneven(volumes):
+    volume_a, volume_b = volumes.volumes
+    moved, file_records = asyncio.run(run_rebalance(volumes, {volume_a: [600]}, threshold=0.1))
+
+    # moving the blob back would only swap the imbalance
+    assert moved == 1
+    assert [file_record.volume for file_record in file_records] == [volume_b]
+    assert used_bytes(volume_a) == 0